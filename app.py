@@ -1,7 +1,14 @@
 import streamlit as st
 import ollama
+import os
+import shutil
+import time
 from langchain_community.document_loaders import DirectoryLoader
-from utils.rag_utils import create_vector_store, get_rag_response, analyze_sentiment
+from utils.rag_utils import (
+    create_vector_store, retrieve_context, analyze_sentiment, file_hash,
+    get_embedder, clear_query_cache, SemanticCache,
+    index_cache_path, save_vector_store, load_vector_store
+)
 from datetime import datetime
 
 # Initialize session states
@@ -9,108 +16,167 @@ if 'vector_store' not in st.session_state:
     st.session_state.vector_store = None
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'doc_hashes' not in st.session_state:
+    st.session_state.doc_hashes = {}
 
-def generate_prompt(context, input_text, no_words, writing_style):
-    """Generate an improved prompt based on the style and context"""
-    style_prompts = {
-        'Academic': """You are a scholarly writer with expertise in academic writing. 
+STYLE_PROMPTS = {
+    'Academic': """You are a scholarly writer with expertise in academic writing. 
             Using the following context: {context}
             Write a well-researched article about: {input_text}
             Include relevant technical details and cite theoretical frameworks where applicable.
             The response should be approximately {no_words} words.
             Focus on methodology, findings, and academic implications.""",
-        
-        'Technical': """You are a technical expert writing for professionals.
+    
+    'Technical': """You are a technical expert writing for professionals.
             Using the following context: {context}
             Create a technical article about: {input_text}
             Include relevant technical concepts, methodologies, and practical implementations.
             The response should be approximately {no_words} words.
             Focus on technical accuracy and actionable insights.""",
-        
-        'Conversational': """You are a skilled writer creating content for a general audience.
+    
+    'Conversational': """You are a skilled writer creating content for a general audience.
             Using the following context: {context}
             Write an engaging and accessible article about: {input_text}
             Explain complex concepts in simple terms and use relatable examples.
             The response should be approximately {no_words} words.
             Focus on clarity and practical applications.""",
-        
-        'Journalistic': """You are a professional journalist.
+    
+    'Journalistic': """You are a professional journalist.
             Using the following context: {context}
             Write a well-balanced news article about: {input_text}
             Present facts objectively and include relevant quotes or references.
             The response should be approximately {no_words} words.
             Focus on clarity, accuracy, and newsworthiness."""
-    }
-    
-    return style_prompts[writing_style].format(
+}
+
+# Number of history entries shown in the sidebar
+HISTORY_DISPLAY_LIMIT = 20
+
+# One fixed context window, since Ollama reloads the model whenever num_ctx
+# changes; it holds the retrieved context plus a 5000-word article
+NUM_CTX = 12288
+
+# Bound format methods, built once at import time
+_PROMPT_FORMATTERS = {style: prompt.format for style, prompt in STYLE_PROMPTS.items()}
+
+def generate_prompt(context, input_text, no_words, writing_style):
+    """Generate an improved prompt based on the style and context"""
+    return _PROMPT_FORMATTERS[writing_style](
         context=context,
         input_text=input_text,
         no_words=no_words
     )
 
-def getLLamaresponse(input_text, no_words, writing_style, use_rag=False):
+def get_semantic_cache():
+    """Return this session's response cache, creating it on first use"""
+    # Created lazily: loading the embedder renders a spinner, which must not
+    # happen before st.set_page_config
+    if 'semantic_cache' not in st.session_state:
+        st.session_state.semantic_cache = SemanticCache(get_embedder())
+    return st.session_state.semantic_cache
+
+def add_to_history(input_text, writing_style, no_words, output, sources, sentiment):
+    """Store a generated article in the chat history"""
+    st.session_state.chat_history.append({
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'input': input_text,
+        'summary': input_text[:50],
+        'style': writing_style,
+        'words': no_words,
+        'output': output,
+        'sentiment': sentiment,
+        'sources': sources if sources else None
+    })
+
+def check_ollama(ttl=60):
+    """Return an error message if Ollama or the model is unavailable, else None"""
+    # A healthy result is reused for ttl seconds to skip the round trip
+    last_ok = st.session_state.get('ollama_checked_at')
+    now = time.time()
+    if last_ok and now - last_ok < ttl:
+        return None
+
     try:
-        try:
-            ollama.list()
-        except ConnectionRefusedError:
-            st.error("""Ollama server connection error. Please:
+        available_models = ollama.list()
+    except ConnectionRefusedError:
+        return """Ollama server connection error. Please:
             1. Open Command Prompt as Administrator
             2. Run: netstat -ano | findstr :11434
             3. If you see a process, run: taskkill /PID XXXX /F (replace XXXX with the process ID)
             4. Run: ollama serve
-            5. Refresh this page""")
-            return None, None, None
-        except Exception as e:
-            st.error(f"""Ollama server error: {str(e)}
-            Please make sure Ollama is properly installed and running.""")
-            return None, None, None
+            5. Refresh this page"""
+    except Exception as e:
+        return f"""Ollama server error: {str(e)}
+            Please make sure Ollama is properly installed and running."""
 
-        available_models = ollama.list()
-        if not any(model.get('name') == 'llama3.2:latest' for model in available_models['models']):
-            st.error("""llama3.2:latest model not found. Please:
+    if not any(model.get('name') == 'llama3.2:latest' for model in available_models['models']):
+        return """llama3.2:latest model not found. Please:
             1. Run: ollama pull llama3.2:latest
             2. Wait for the download to complete
-            3. Refresh this page""")
+            3. Refresh this page"""
+
+    st.session_state.ollama_checked_at = now
+    return None
+
+def stream_article(prompt, no_words):
+    """Yield the generated article piece by piece"""
+    # English averages ~1.3-1.5 tokens per word; 2x leaves headroom
+    num_predict = int(no_words) * 2
+    for chunk in ollama.generate(
+        model="llama3.2:latest",
+        prompt=prompt,
+        stream=True,
+        options={
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "num_predict": num_predict,
+            # Without room for prompt and article, Ollama shifts the prompt out
+            "num_ctx": NUM_CTX
+        }
+    ):
+        yield chunk['response']
+
+def getLLamaresponse(input_text, no_words, writing_style, use_rag=False):
+    try:
+        use_rag = bool(use_rag and st.session_state.vector_store)
+        cache_scope = (writing_style, int(no_words), use_rag)
+        cached = get_semantic_cache().get(input_text, scope=cache_scope)
+        if cached:
+            st.markdown("### Generated Article:")
+            st.write(cached[0])
+            add_to_history(input_text, writing_style, no_words, *cached)
+            return cached
+
+        ollama_error = check_ollama()
+        if ollama_error:
+            st.error(ollama_error)
             return None, None, None
 
-        if use_rag and st.session_state.vector_store:
-            rag_response = get_rag_response(
+        if use_rag:
+            # Retrieved chunks go straight into the article prompt
+            context, sources = retrieve_context(
                 st.session_state.vector_store,
                 input_text
             )
-            context = rag_response['result']
-            sources = [doc.metadata['source'] for doc in rag_response['source_documents']]
         else:
             context = ""
             sources = []
         
         prompt = generate_prompt(context, input_text, no_words, writing_style)
         
-        response = ollama.generate(
-            model="llama3.2:latest",
-            prompt=prompt,
-            options={
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "num_tokens": int(no_words) * 4
-            }
-        )
+        # Render tokens as they arrive instead of waiting for the full article
+        st.markdown("### Generated Article:")
+        response_text = st.write_stream(stream_article(prompt, no_words))
         
         # Analyze sentiment
-        sentiment_analysis = analyze_sentiment(response['response'])
+        sentiment_analysis = analyze_sentiment(response_text)
         
-        # Store in chat history
-        st.session_state.chat_history.append({
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'input': input_text,
-            'style': writing_style,
-            'words': no_words,
-            'output': response['response'],
-            'sentiment': sentiment_analysis,
-            'sources': sources if sources else None
-        })
+        result = (response_text, sources, sentiment_analysis)
         
-        return response['response'], sources, sentiment_analysis
+        # Store in chat history
+        add_to_history(input_text, writing_style, no_words, *result)
+        get_semantic_cache().put(input_text, result, scope=cache_scope)
+        return result
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
         return None, None, None
@@ -138,19 +204,55 @@ with st.sidebar:
     )
     
     if uploaded_files:
-        try:
-            with st.spinner("Processing documents..."):
-                st.session_state.vector_store = create_vector_store(uploaded_files)
-            st.success("Documents processed successfully!")
-        except Exception as e:
-            st.error(f"Error processing documents: {str(e)}")
+        file_hashes = {file_hash(f): f for f in uploaded_files}
+        if set(st.session_state.doc_hashes) - set(file_hashes):
+            # Documents were removed, so rebuild the index from scratch
             st.session_state.vector_store = None
+            st.session_state.doc_hashes = {}
+        new_files = {h: f for h, f in file_hashes.items() if h not in st.session_state.doc_hashes}
+        
+        if new_files:
+            try:
+                with st.spinner("Processing documents..."):
+                    cache_path = index_cache_path(file_hashes)
+                    cached_store = None
+                    if os.path.isdir(cache_path):
+                        # These documents were indexed before; reuse that index
+                        try:
+                            cached_store = load_vector_store(cache_path)
+                        except Exception as e:
+                            # Drop the unreadable copy so it is rebuilt and saved again
+                            st.warning(f"Could not load the cached document index: {str(e)}")
+                            shutil.rmtree(cache_path, ignore_errors=True)
+                    if cached_store is not None:
+                        st.session_state.vector_store = cached_store
+                    else:
+                        st.session_state.vector_store = create_vector_store(
+                            list(new_files.values()),
+                            st.session_state.vector_store
+                        )
+                        try:
+                            save_vector_store(st.session_state.vector_store, cache_path)
+                        except Exception as e:
+                            # The in-memory index is still usable without the disk copy
+                            st.warning(f"Could not cache the document index: {str(e)}")
+                    clear_query_cache()
+                    get_semantic_cache().clear()
+                st.session_state.doc_hashes = {h: f.name for h, f in file_hashes.items()}
+                st.success("Documents processed successfully!")
+            except Exception as e:
+                st.error(f"Error processing documents: {str(e)}")
+                st.session_state.vector_store = None
+                st.session_state.doc_hashes = {}
     
     # Chat history section
     st.subheader("Generation History")
     if st.session_state.chat_history:
-        for idx, item in enumerate(reversed(st.session_state.chat_history)):
-            with st.expander(f"#{len(st.session_state.chat_history)-idx}: {item['input'][:50]}..."):
+        history_count = len(st.session_state.chat_history)
+        # Only the most recent entries are rendered on each rerun
+        recent_history = st.session_state.chat_history[-HISTORY_DISPLAY_LIMIT:][::-1]
+        for idx, item in enumerate(recent_history):
+            with st.expander(f"#{history_count-idx}: {item['summary']}..."):
                 st.text(f"Timestamp: {item['timestamp']}")
                 st.text(f"Style: {item['style']}")
                 st.text(f"Target Words: {item['words']}")
@@ -200,9 +302,6 @@ if submit:
         with st.spinner("Generating article..."):
             response, sources, sentiment = getLLamaresponse(input_text, no_words, writing_style, use_rag)
             if response:
-                st.markdown("### Generated Article:")
-                st.write(response)
-                
                 st.markdown("### Sentiment Analysis:")
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
@@ -0,0 +1,2 @@
+# Keeps the repository root on sys.path so tests can import the top-level
+# modules (text_splitting, semantic_cache) when run with plain `pytest`
@@ -1,13 +1,77 @@
 from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain.text_splitter import TextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.chains import RetrievalQA
-from langchain_community.llms import Ollama
+from langchain_core.embeddings import Embeddings
 from langchain.docstore.document import Document
 from textblob import TextBlob
-import tempfile
+import streamlit as st
+import faiss
+import numpy as np
+import torch
+from functools import lru_cache
+import uuid
+import hashlib
+import math
+import io
 import os
+import pickle
+import shutil
+import tempfile
 import PyPDF2
+from text_splitting import DEFAULT_SEPARATORS, fast_split
+from semantic_cache import SemanticCache, normalize_vectors
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# Vector stores are persisted here, keyed by the documents they index
+INDEX_CACHE_DIR = os.path.join(".cache", "faiss_index")
+# Bump when the on-disk layout or the way indexes are built changes
+INDEX_CACHE_VERSION = 1
+# Least recently used stores beyond this many are deleted
+INDEX_CACHE_MAX_ENTRIES = 8
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes query embeddings per instance"""
+
+    def __init__(self, embeddings, maxsize=1024):
+        self.embeddings = embeddings
+        self._cached_query = lru_cache(maxsize=maxsize)(self._embed_query)
+
+    def _embed_query(self, text):
+        vector = self.embeddings.embed_query(text)
+        return tuple(normalize_vectors(vector)[0].tolist())
+
+    def embed_query(self, text):
+        return list(self._cached_query(text))
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def cache_clear(self):
+        """Forget memoized query embeddings"""
+        self._cached_query.cache_clear()
+
+def clear_query_cache():
+    """Forget memoized query embeddings of the shared embedder"""
+    get_embedder().cache_clear()
+
+@st.cache_resource
+def get_embedder():
+    """Load the sentence embedding model once per process"""
+    return CachedEmbeddings(HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': 'cuda' if torch.cuda.is_available() else 'cpu'},
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': 128}
+    ))
 
 def analyze_sentiment(text):
     """Analyze sentiment of the text"""
@@ -42,75 +106,242 @@ def analyze_sentiment(text):
         'subjectivity': round(subjectivity, 2)
     }
 
-def process_pdf(file_path):
-    """Extract text from PDF file"""
+def process_pdf(pdf_bytes, file_name="PDF"):
+    """Extract text from the bytes of a PDF file"""
     text = ""
     try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
+        if pdfium is not None:
+            # PDFium extracts text natively, much faster than PyPDF2
+            pdf = pdfium.PdfDocument(pdf_bytes)
+            try:
+                text = "\n".join(page.get_textpage().get_text_range() for page in pdf) + "\n"
+            finally:
+                pdf.close()
+        else:
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
             for page in pdf_reader.pages:
                 text += page.extract_text() + "\n"
     except Exception as e:
-        raise Exception(f"Error processing PDF {os.path.basename(file_path)}: {str(e)}")
+        raise Exception(f"Error processing PDF {file_name}: {str(e)}")
     return text
 
-def create_vector_store(uploaded_files):
-    """Create a FAISS vector store from uploaded files"""
+def gpu_available():
+    """Whether FAISS was built with GPU support and a GPU is present"""
+    return hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+
+@st.cache_resource
+def _get_gpu_resources():
+    return faiss.StandardGpuResources()
+
+def to_gpu(index, gpu_threshold=5000):
+    """Move a flat index to the GPU once it is large enough to benefit"""
+    # Below the threshold PCIe transfer outweighs the faster scan
+    if index.ntotal > gpu_threshold and isinstance(index, faiss.IndexFlat) and gpu_available():
+        return faiss.index_cpu_to_gpu(_get_gpu_resources(), 0, index)
+    return index
+
+def to_cpu(index):
+    """Copy a GPU index back to the CPU, e.g. for serialization"""
+    if hasattr(faiss, "GpuIndex") and isinstance(index, faiss.GpuIndex):
+        return faiss.index_gpu_to_cpu(index)
+    return index
+
+def _index_kind(count, hnsw_threshold=500, gpu_threshold=5000):
+    """Name the index type build_index picks for a given number of vectors"""
+    if count > gpu_threshold and gpu_available():
+        return "gpu"
+    return "flat" if count < hnsw_threshold else "hnsw"
+
+def build_index(vectors, hnsw_threshold=500, gpu_threshold=5000):
+    """Build a FAISS inner-product index sized for the number of vectors"""
+    dim = vectors.shape[1]
+    kind = _index_kind(len(vectors), hnsw_threshold, gpu_threshold)
+    if kind == "gpu":
+        # FAISS has no GPU HNSW; an exact GPU scan is fast at this size
+        index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+        return to_gpu(index, gpu_threshold)
+    if kind == "flat":
+        # Brute force is exact and cheap for small corpora
+        index = faiss.IndexFlatIP(dim)
+    else:
+        # 8-bit scalar quantized storage is 4x smaller than float32
+        index = faiss.IndexHNSWSQ(
+            dim, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT
+        )
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+def _extract_one(uploaded_file):
+    """Extract a Document from an uploaded file, or None if it has no text"""
+    file_extension = os.path.splitext(uploaded_file.name)[1].lower()
+    try:
+        # Parse the uploaded bytes in memory instead of via a temp file
+        data = uploaded_file.getvalue()
+        if file_extension == '.pdf':
+            text = process_pdf(data, uploaded_file.name)
+        else:  # .txt files
+            text = data.decode('utf-8', errors='replace')
+        
+        if text.strip():
+            return Document(
+                page_content=text,
+                metadata={
+                    "source": uploaded_file.name,
+                    "type": file_extension
+                }
+            )
+    except Exception as e:
+        raise Exception(f"Error processing {uploaded_file.name}: {str(e)}")
+    return None
+
+class FastTextSplitter(TextSplitter):
+    """Text splitter that locates all separators in one pass over the text"""
+
+    def __init__(self, separators=DEFAULT_SEPARATORS, **kwargs):
+        # Chunks are measured in characters; a custom length is not supported
+        if kwargs.get('length_function', len) is not len:
+            raise ValueError("FastTextSplitter only supports length_function=len")
+        super().__init__(**kwargs)
+        self._separators = tuple(separators)
+
+    def split_text(self, text):
+        return fast_split(text, self._chunk_size, self._chunk_overlap, self._separators)
+
+def _get_text_splitter():
+    return FastTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+
+def file_hash(uploaded_file):
+    """SHA-256 of an uploaded file's contents"""
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+def create_vector_store(uploaded_files, vector_store=None):
+    """Create a FAISS vector store from uploaded files, or add them to an existing one"""
     documents = []
-    
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for uploaded_file in uploaded_files:
-            temp_path = os.path.join(temp_dir, uploaded_file.name)
-            with open(temp_path, 'wb') as f:
-                f.write(uploaded_file.getvalue())
-            
-            file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-            try:
-                if file_extension == '.pdf':
-                    text = process_pdf(temp_path)
-                else:  # .txt files
-                    with open(temp_path, 'r', encoding='utf-8') as f:
-                        text = f.read()
-                
-                if text.strip():
-                    doc = Document(
-                        page_content=text,
-                        metadata={
-                            "source": uploaded_file.name,
-                            "type": file_extension
-                        }
-                    )
-                    documents.append(doc)
-            except Exception as e:
-                raise Exception(f"Error processing {uploaded_file.name}: {str(e)}")
+    for uploaded_file in uploaded_files:
+        doc = _extract_one(uploaded_file)
+        if doc is not None:
+            documents.append(doc)
     
     if not documents:
+        if vector_store is not None:
+            # New uploads without text leave the existing index as it is
+            return vector_store
         raise Exception("No valid documents were processed")
     
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len
-    )
-    texts = text_splitter.split_documents(documents)
+    texts = _get_text_splitter().split_documents(documents)
+    
+    embeddings = get_embedder()
     
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'}
+    # Encode all chunks in one batched call
+    vectors = normalize_vectors(
+        embeddings.embed_documents([t.page_content for t in texts])
     )
     
-    vector_store = FAISS.from_documents(texts, embeddings)
+    if vector_store is not None:
+        # Only the new chunks are embedded and appended to the index
+        total = vector_store.index.ntotal
+        rebuild = _index_kind(total) != _index_kind(total + len(vectors))
+        if rebuild:
+            old_vectors = to_cpu(vector_store.index).reconstruct_n(0, total)
+        vector_store.add_embeddings(
+            zip([t.page_content for t in texts], vectors),
+            metadatas=[t.metadata for t in texts]
+        )
+        if rebuild:
+            # Growing past a size threshold switches to the matching index type
+            vector_store.index = build_index(np.vstack([old_vectors, vectors]))
+        return vector_store
+    
+    index = build_index(vectors)
+    
+    ids = [str(uuid.uuid4()) for _ in texts]
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, texts))),
+        index_to_docstore_id=dict(enumerate(ids)),
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
     return vector_store
 
-def get_rag_response(vector_store, query, style="detailed"):
-    """Get response using RAG"""
-    llm = Ollama(model="llama3.2:latest")
+def index_cache_path(file_hashes):
+    """Directory for the persisted vector store of a set of documents"""
+    # Settings that change the stored vectors or chunks are part of the key,
+    # so stores built under an older configuration are never reused
+    config = f"v{INDEX_CACHE_VERSION}|{EMBEDDING_MODEL}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{DEFAULT_SEPARATORS!r}"
+    key = hashlib.sha256("|".join([config, *sorted(file_hashes)]).encode()).hexdigest()
+    return os.path.join(INDEX_CACHE_DIR, key)
+
+def save_vector_store(vector_store, path):
+    """Persist a vector store to disk in the layout of FAISS.save_local"""
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    # Write into a scratch directory and move it into place only once complete,
+    # so a failed save never leaves a partial store behind
+    temp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    try:
+        faiss.write_index(to_cpu(vector_store.index), os.path.join(temp_dir, "index.faiss"))
+        with open(os.path.join(temp_dir, "index.pkl"), "wb") as f:
+            pickle.dump((vector_store.docstore, vector_store.index_to_docstore_id), f)
+        os.replace(temp_dir, path)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    prune_index_cache()
+
+def prune_index_cache(max_entries=INDEX_CACHE_MAX_ENTRIES):
+    """Delete the least recently used persisted stores beyond max_entries"""
+    if not os.path.isdir(INDEX_CACHE_DIR):
+        return
+    # Scratch directories of saves in progress start with a dot
+    entries = [
+        entry for entry in os.scandir(INDEX_CACHE_DIR)
+        if entry.is_dir() and not entry.name.startswith(".")
+    ]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[max_entries:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+def load_vector_store(path):
+    """Load a persisted vector store, memory-mapping the FAISS index"""
+    index = faiss.read_index(os.path.join(path, "index.faiss"), faiss.IO_FLAG_MMAP)
+    index = to_gpu(index)
+    # Only reads stores this app wrote to its own cache directory
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    # Mark the store as recently used for prune_index_cache
+    os.utime(path)
     
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",
-        retriever=vector_store.as_retriever(search_kwargs={'k': 3}),
-        return_source_documents=True
+    return FAISS(
+        embedding_function=get_embedder(),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
     )
-    
-    return qa_chain(query) 
+
+def retrieval_k(vector_store, max_k=3):
+    """Number of chunks to retrieve for the size of the index"""
+    ntotal = vector_store.index.ntotal
+    if ntotal < 10:
+        return min(2, max(ntotal, 1))
+    return min(max_k, math.ceil(math.log2(ntotal)))
+
+def retrieve_context(vector_store, query, k=None):
+    """Retrieve reference text and its sources for the query"""
+    # MMR skips near-duplicate chunks so fewer context tokens reach the LLM
+    docs = vector_store.max_marginal_relevance_search(
+        query,
+        k=k or retrieval_k(vector_store),
+        fetch_k=10,
+        lambda_mult=0.5
+    )
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return context, [doc.metadata['source'] for doc in docs]
@@ -0,0 +1,81 @@
+import numpy as np
+import faiss
+import time
+
+def normalize_vectors(vectors):
+    """Convert vectors to a float32 matrix of unit L2 norm rows"""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    # Inner product of unit vectors is cosine similarity
+    faiss.normalize_L2(vectors)
+    return vectors
+
+class SemanticCache:
+    """Cache generated responses keyed by the embedding of the request"""
+
+    def __init__(self, embeddings, threshold=0.9, ttl=3600, max_entries=512):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.index = None
+        self.entries = []
+
+    def _embed(self, text):
+        return normalize_vectors(self.embeddings.embed_query(text))
+
+    def _rebuild(self):
+        self.index = None
+        if self.entries:
+            vectors = np.vstack([entry['vector'] for entry in self.entries])
+            self.index = faiss.IndexFlatIP(vectors.shape[1])
+            self.index.add(vectors)
+
+    def _evict(self):
+        now = time.time()
+        entries = [e for e in self.entries if now - e['created'] < self.ttl]
+        if len(entries) > self.max_entries:
+            # Drop the least recently used entries
+            entries.sort(key=lambda e: e['last_used'])
+            entries = entries[-self.max_entries:]
+        if len(entries) != len(self.entries):
+            self.entries = entries
+            self._rebuild()
+
+    def get(self, text, scope=None):
+        """Return the cached value for a similar request, or None"""
+        self._evict()
+        if self.index is None:
+            return None
+        
+        k = min(16, self.index.ntotal)
+        scores, ids = self.index.search(self._embed(text), k)
+        for score, idx in zip(scores[0], ids[0]):
+            if idx < 0 or score < self.threshold:
+                break
+            entry = self.entries[idx]
+            # Only reuse responses generated with the same settings
+            if entry['scope'] == scope:
+                entry['last_used'] = time.time()
+                return entry['value']
+        return None
+
+    def put(self, text, value, scope=None):
+        """Store a value for the request"""
+        now = time.time()
+        vector = self._embed(text)
+        self.entries.append({
+            'vector': vector,
+            'value': value,
+            'scope': scope,
+            'created': now,
+            'last_used': now
+        })
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(vector.shape[1])
+        self.index.add(vector)
+        self._evict()
+
+    def clear(self):
+        """Remove all cached values"""
+        self.entries = []
+        self.index = None
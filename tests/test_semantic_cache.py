@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("faiss")
+
+import semantic_cache
+from semantic_cache import SemanticCache
+
+
+class StubEmbeddings:
+    """Maps each known text to a fixed vector"""
+
+    vectors = {
+        "cats": [1.0, 0.0, 0.0],
+        "kittens": [0.99, 0.1, 0.0],
+        "dogs": [0.0, 1.0, 0.0],
+        "fish": [0.0, 0.0, 1.0],
+    }
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(semantic_cache.time, "time", clock)
+    return clock
+
+
+def test_similar_request_hits(clock):
+    cache = SemanticCache(StubEmbeddings())
+    cache.put("cats", "article about cats", scope="Academic")
+    assert cache.get("kittens", scope="Academic") == "article about cats"
+    assert cache.get("dogs", scope="Academic") is None
+
+
+def test_scope_must_match(clock):
+    cache = SemanticCache(StubEmbeddings())
+    cache.put("cats", "academic cats", scope="Academic")
+    assert cache.get("cats", scope="Technical") is None
+    cache.put("cats", "technical cats", scope="Technical")
+    assert cache.get("cats", scope="Technical") == "technical cats"
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache(StubEmbeddings(), ttl=60)
+    cache.put("cats", "article about cats")
+    clock.now += 59
+    assert cache.get("cats") == "article about cats"
+    clock.now += 2
+    assert cache.get("cats") is None
+    assert cache.entries == []
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SemanticCache(StubEmbeddings(), max_entries=2)
+    cache.put("cats", "cats")
+    clock.now += 1
+    cache.put("dogs", "dogs")
+    clock.now += 1
+    # Reading cats makes dogs the least recently used entry
+    assert cache.get("cats") == "cats"
+    clock.now += 1
+    cache.put("fish", "fish")
+    assert cache.get("dogs") is None
+    assert cache.get("cats") == "cats"
+    assert cache.get("fish") == "fish"
+
+
+def test_clear_removes_everything(clock):
+    cache = SemanticCache(StubEmbeddings())
+    cache.put("cats", "cats")
+    cache.clear()
+    assert cache.get("cats") is None
@@ -0,0 +1,66 @@
+from text_splitting import fast_split
+
+
+def _spans(text, chunks):
+    """Locate each chunk in the text, in order"""
+    spans = []
+    pos = 0
+    for chunk in chunks:
+        start = text.index(chunk, pos)
+        spans.append((start, start + len(chunk)))
+        pos = start + 1
+    return spans
+
+
+def test_empty_input():
+    assert fast_split("") == []
+    assert fast_split("   \n\n  ") == []
+
+
+def test_short_text_is_one_chunk():
+    assert fast_split("Just one sentence.") == ["Just one sentence."]
+
+
+def test_separator_is_not_counted_in_chunk():
+    assert fast_split("a b c d e f g h", 3, 0) == ["a b", "c d", "e f", "g h"]
+    assert fast_split("One. Two. Three.", 9, 0) == ["One. Two.", "Three."]
+
+
+def test_no_separators_keeps_overlap():
+    text = "".join(str(i) for i in range(1000))[:2500]
+    chunks = fast_split(text, chunk_size=1000, chunk_overlap=200)
+    spans = _spans(text, chunks)
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+        assert prev_end - start == 200
+
+
+def test_chunks_cover_text_without_gaps():
+    text = " ".join(
+        f"Sentence {i} talks about topic {i % 7}." + ("\n\n" if i % 5 == 0 else "")
+        for i in range(400)
+    )
+    chunks = fast_split(text, chunk_size=300, chunk_overlap=60)
+    spans = _spans(text, chunks)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert text[:spans[0][0]].strip() == ""
+    assert text[spans[-1][1]:].strip() == ""
+    for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+        # Consecutive chunks overlap or are separated by whitespace only
+        assert start <= prev_end or text[prev_end:start].strip() == ""
+
+
+def test_overlap_stays_within_window():
+    text = " ".join(f"word{i}" for i in range(2000))
+    chunks = fast_split(text, chunk_size=200, chunk_overlap=50)
+    spans = _spans(text, chunks)
+    for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+        assert 0 < prev_end - start <= 50
+
+
+def test_prefers_paragraph_breaks():
+    first = "First paragraph. " * 5
+    text = first + "\n\n" + "Second paragraph. " * 5
+    chunks = fast_split(text, chunk_size=120, chunk_overlap=0)
+    assert chunks[0] == first.strip()
@@ -0,0 +1,48 @@
+from bisect import bisect_left, bisect_right
+import re
+
+# Break points in order of preference when splitting text into chunks
+DEFAULT_SEPARATORS = ("\n\n", "\n", ". ", "? ", "! ", " ")
+
+def fast_split(text, chunk_size=1000, chunk_overlap=200, separators=DEFAULT_SEPARATORS):
+    """Split text into overlapping chunks, breaking at the most preferred separator"""
+    # A single scan records, per separator, where a chunk may end (before the
+    # separator's trailing whitespace) and where the following text resumes
+    pattern = re.compile("|".join(re.escape(sep) for sep in separators))
+    breaks = {sep: [] for sep in separators}
+    resumes = {sep: [] for sep in separators}
+    all_resumes = []
+    for match in pattern.finditer(text):
+        sep = match.group()
+        breaks[sep].append(match.start() + len(sep.rstrip()))
+        resumes[sep].append(match.end())
+        all_resumes.append(match.end())
+    
+    chunks = []
+    start = prev_end = 0
+    length = len(text)
+    while start < length:
+        end = resume = min(start + chunk_size, length)
+        if end < length:
+            for sep in separators:
+                positions = breaks[sep]
+                i = bisect_right(positions, end) - 1
+                # Every chunk must end past the previous one to make progress
+                if i >= 0 and positions[i] > max(start, prev_end):
+                    end = positions[i]
+                    resume = resumes[sep][i]
+                    break
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        
+        # Begin the next chunk after the first separator inside the overlap
+        # window, or cut mid-text when the window has none, so overlap is never lost
+        overlap_start = max(end - chunk_overlap, start + 1)
+        i = bisect_left(all_resumes, overlap_start)
+        start = all_resumes[i] if i < len(all_resumes) and all_resumes[i] <= resume else overlap_start
+        prev_end = end
+    return chunks